@@ -31,7 +31,7 @@ class Simple_Fiber(Device):
 class Alice(Agent):
     def run(self):
         p = self.program
-        for q in self.qubits:
+        for q in self.qubits_list:
             p += H(q)
             p += X(q)
             self. qsend('Bob', [q])
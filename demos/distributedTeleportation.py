@@ -27,8 +27,8 @@ class Alice(Agent):
 
     def run(self):
         # Define Qubits
-        a, psi = self.qubits 
-        b = bob.qubits[0]
+        a, psi = self.qubits_list
+        b = bob.qubits_list[0]
 
         # Start Teleport
         self.start_teleportation(psi, a, b)
@@ -49,8 +49,8 @@ class Bob(Agent):
 
     def run(self):
         # Define Qubits
-        b = self.qubits[0]
-        _, psi = alice.qubits
+        b = self.qubits_list[0]
+        _, psi = alice.qubits_list
 
         # Receive Measurement from Cat-entangler
         self.crecv(alice.name)
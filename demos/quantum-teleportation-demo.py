@@ -34,7 +34,7 @@ class Alice(Agent):
         p = self.program
 
         # Define Alice's Qubits
-        phi = self.qubits[0]
+        phi = self.qubits_list[0]
         qubitsCharlie = self.qrecv(charlie.name)
         a = qubitsCharlie[0]
 
@@ -6,7 +6,7 @@ import time
 __all__ = ["Agent"]
 
 class Agent(threading.Thread):
-    def __init__(self, program=None, qubits=[], cmem=[], name=None):
+    def __init__(self, program=None, qubits=None, cmem=None, name=None):
         '''
         Agents are codified versions of Alice and Bob (i.e. single nodes in a quantum network) 
         that can send and receive classical and quantum information over connections. 
@@ -18,17 +18,19 @@ class Agent(threading.Thread):
         * Agents have a network monitor to record the traffic they see
 
         :param PyQuil<Program> program: program
-        :param List<int> qubits: list of qubits owned by agent
+        :param List<int> qubits: list of qubits owned by agent (stored as a set)
         :param List<int> cmem: list of cbits owned by agent
         :param String name: name of agent, defaults to name of class
         '''
-        threading.Thread.__init__(self)
-
         # Name of the agent, e.g. "Alice". Defaults to the name of the class.
-        if name is not None:
-            self.name = name
-        else:
-            self.name = self.__class__.__name__
+        if name is None:
+            name = self.__class__.__name__
+
+        # Thread.__init__ hashes the agent, so intern the name and cache its hash first
+        name = sys.intern(name)
+        self._hash = hash(name)
+        threading.Thread.__init__(self, name=name)
+        self.name = name
 
         self.time = 0.0
         self.pulse_length = 10 * 10 ** -12 # 10 ps default photon pulse length
@@ -36,8 +38,8 @@ class Agent(threading.Thread):
         self.cconnections = {}
 
         # Define qubits, corresponding classical memory and program
-        self.qubits = qubits 
-        self.cmem = cmem 
+        self.qubits = set() if qubits is None else set(qubits)
+        self.cmem = [] if cmem is None else cmem
         self.program = program
 
         # Define Agent Devices
@@ -74,12 +76,13 @@ class Agent(threading.Thread):
     def _tracer(self, frame, event, arg):
         '''
         Prevents agent from modifying qubits that it does not own and manage by
-        examining the frame and intercepting all pyquil.gates calls 
+        examining the frame and intercepting all pyquil.gates calls. Only call events are
+        needed, so no local tracer is returned and line events are never generated.
         '''
         if event == "call":
             if self.using_distributed_gate: 
-                return self._tracer
-            if frame.f_globals['__name__'] == 'pyquil.gates':
+                return None
+            if frame.f_globals.get('__name__') == 'pyquil.gates':
                 # Returns dictionary of parameter names and their values
                 argsToGate = inspect.getargvalues(frame)
                 # Extract parameter values 
@@ -90,7 +93,7 @@ class Agent(threading.Thread):
                 if not all(q in self.qubits for q in qubits):
                     raise Exception('Agent cannot modify qubits they do not own (including qubits that have been lost)')
 
-        return self._tracer
+        return None
     
     def set_program(self, program):
         '''
@@ -118,6 +121,30 @@ class Agent(threading.Thread):
         '''
         self.source_devices.extend(new_source_devices)
 
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, name):
+        '''
+            Set agent's name, interning it and refreshing the cached hash. Rename an
+            agent before adding it to connections, as they key on its name
+
+            :param String name: name of agent
+        '''
+        self._name = sys.intern(str(name))
+        self._hash = hash(self._name)
+
+    @property
+    def qubits_list(self):
+        '''
+        Sorted list of the qubits owned by agent, for callers that index or unpack
+
+        :return: list of qubits
+        '''
+        return sorted(self.qubits)
+
     @property
     def cmem(self): 
         return self.__cmem
@@ -160,13 +187,13 @@ class Agent(threading.Thread):
         '''
         Agents are hashed by their (unique) names
         '''
-        return hash(self.name)
+        return self._hash
     
     def __eq__(self, other):
         '''
-        Agents are compared for equality by their names.
+        Agents are compared for equality by their (interned) names.
         '''
-        return self.name == other.name
+        return self is other or self.name == other.name
 
     def __ne__(self, other):
         '''
@@ -177,20 +204,21 @@ class Agent(threading.Thread):
     def qsend(self, target, qubits):
         '''
         Send qubits from agent to target. Connection will place qubits on queue 
-        for target to retrieve. 
+        for target to retrieve. Sent qubits are removed from self.qubits in place, so 
+        do not iterate over self.qubits while sending; iterate over self.qubits_list instead.
 
         :param String target: name of destination for qubits 
         :param List<int> qubits: list of qubits to send to destination
         '''
         # Raise exception if agent sends qubits they do no have
-        if not set(qubits).issubset(set(self.qubits)): 
+        if not all(q in self.qubits for q in qubits):
             raise Exception('Agent cannot send qubits they do not have')
             
         connection = self.qconnections[target]
         source_delay = connection.put(self.name, target, qubits, self.time)
     
         # Removing qubits being sent
-        self.qubits = list(set(self.qubits) - set(qubits))
+        self.qubits.difference_update(qubits)
 
         # Update Agent's Time
         self.time += source_delay
@@ -230,9 +258,9 @@ class Agent(threading.Thread):
         :param List<int> cbits: indices of cbits source is sending to target
         '''
         connection = self.cconnections[target]
-        source_delay  = connection.put(target, cbits)
-        scaled_source_delay = source_delay*len(cbits)
-        self.time += scaled_source_delay
+        # Source delay is already scaled by the number of cbits sent
+        source_delay = connection.put(target, cbits)
+        self.time += source_delay
         
         #Update Master Clock
         self.master_clock.record_ctransaction(self.time, 'sent', self.name, target, cbits)
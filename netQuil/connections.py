@@ -1,16 +1,46 @@
-import queue
-import multiprocessing
-import itertools
-import sys
+import collections
+import threading
 
 __all__ = ["QConnect", "CConnect"]
 
 pulse_length_default = 10 * 10 ** -12 # 10 ps photon pulse length
 signal_speed = 2.998 * 10 ** 5 #speed of light in km/s
 fiber_length_default = 0.0
+# Travel time through default fiber, used when a connection has no transit devices
+_default_fiber_delay = fiber_length_default/signal_speed
+
+class _PacketQueue:
+    def __init__(self):
+        '''
+        Blocking FIFO queue of packets for a single agent. Agents run as threads within 
+        one process, so a deque guarded by a condition is sufficient.
+        '''
+        self._packets = collections.deque()
+        self._ready = threading.Condition(threading.Lock())
+
+    def put(self, packet):
+        '''
+        Append packet and wake a waiting receiver
+
+        :param Tuple packet: packet to place on queue
+        '''
+        with self._ready:
+            self._packets.append(packet)
+            self._ready.notify()
+
+    def get(self):
+        '''
+        Pop the oldest packet, blocking until one is available
+
+        :returns: oldest packet on queue
+        '''
+        with self._ready:
+            while not self._packets:
+                self._ready.wait()
+            return self._packets.popleft()
 
 class QConnect: 
-    def __init__(self, *args, transit_devices=[]):
+    def __init__(self, *args, transit_devices=None):
         '''
         This is the base class for a quantum connection between multiple agents. 
 
@@ -18,6 +48,7 @@ class QConnect:
         :param List<Devices> transit_devices: list of devices qubits travel through 
         '''
         agents = list(args)
+        transit_devices = [] if transit_devices is None else transit_devices
         self.agents = {}
         self.source_devices = {}
         self.target_devices = {}
@@ -33,17 +64,25 @@ class QConnect:
             self.source_devices.update({agent.name: agent.source_devices})
             self.target_devices.update({agent.name: agent.target_devices})
             self.transit_devices.update({agent.name: transit_devices})
-            self.queues.update({agent.name: queue.Queue()})
+            self.queues.update({agent.name: _PacketQueue()})
 
             for agentConnect in agents:
                 if agentConnect != agent:
                     agent.qconnections[agentConnect.name] = self
 
+        '''
+        Pair the transit and target devices qubits travel through on their way to each 
+        agent once. The pair holds the live device lists, so devices added to an agent
+        after the connection is made are still applied.
+        '''
+        self._travel_chain = {}
+        for agent in agents:
+            self._travel_chain[agent.name] = (transit_devices, agent.target_devices)
+
     def put(self, source, target, qubits, source_time):
         ''' 
-        Constructs full list of devices that each qubit must travel through. Sends the qubits
-        through source devices. Places qubits and a list of transit and target 
-        devices on the queue. Queue is keyed on the target agent's name.
+        Sends the qubits through source devices. Places qubits and the transit and 
+        target devices of the target agent on the queue. Queue is keyed on the target agent's name.
         
         :param String source: name of agent where the qubits being sent originated
         :param String target: name of agent receiving qubits
@@ -52,13 +91,6 @@ class QConnect:
         :returns: time qubits took to pass through source devices
         '''
         source_devices = self.source_devices[source]
-        transit_devices = self.transit_devices[source]
-        target_devices = self.target_devices[target]
-
-        non_source_devices = {
-            "transit": transit_devices,
-            "target": target_devices,
-        }
 
         program = self.agents[source].program
         source_delay = 0
@@ -75,13 +107,13 @@ class QConnect:
                 # If qubits are still remaining 
                 if traveling_qubits:
                     res = device.apply(program, traveling_qubits)
-                    if 'lost_qubits' in res.keys(): 
-                        lost_qubits = res['lost_qubits']
+                    lost_qubits = res.get('lost_qubits')
+                    if lost_qubits is not None:
                         # Remove lost qubits from traveling qubits
                         traveling_qubits = list(set(traveling_qubits) - set(lost_qubits))
                         # Add lost_qubits lost from current device to total_lost_qubits
                         total_lost_qubits += lost_qubits
-                    if 'delay' in res.keys(): source_delay += res['delay']
+                    source_delay += res.get('delay', 0)
 
                 else: break
 
@@ -94,7 +126,7 @@ class QConnect:
         # Scale source delay time according to number of qubits sent
         scaled_source_delay = source_delay*len(qubits) 
 
-        self.queues[target].put((traveling_qubits, non_source_devices, scaled_source_delay, source_time))
+        self.queues[target].put((traveling_qubits, self._travel_chain[target], scaled_source_delay, source_time))
         return scaled_source_delay
 
     def get(self, agent): 
@@ -107,42 +139,43 @@ class QConnect:
         :param Agent agent: agent receiving the qubits 
         :returns: list of qubits, time to pass through transit and target devices, and the source agent's time
         '''
-        traveling_qubits, devices, source_delay, source_time = self.queues[agent.name].get()
+        traveling_qubits, travel_chain, source_delay, source_time = self.queues[agent.name].get()
 
-        agent.qubits = list(set(traveling_qubits + agent.qubits))
+        agent.qubits.update(traveling_qubits)
 
         program = self.agents[agent.name].program
-       
-        transit_devices = devices["transit"]
-        target_devices = devices["target"]
 
         # Number of qubits before any are lost 
         num_travel_qubits = len(traveling_qubits)
         travel_delay = 0
 
-        if not transit_devices:
-            travel_delay += fiber_length_default/signal_speed
-        if not target_devices:
-            travel_delay += 0
+        if not self.transit_devices[agent.name]:
+            travel_delay += _default_fiber_delay
         
-        total_lost_qubits = [q for q in traveling_qubits if q < 0 or q == float("-inf")] 
-        remaining_qubits = [q for q in traveling_qubits if q >= 0]
-
-        for device in list(itertools.chain(transit_devices, target_devices)):
-            # If qubits are remaining 
-            if remaining_qubits: 
-                res = device.apply(program, traveling_qubits)
-                if 'lost_qubits' in res.keys(): 
-                    lost_qubits = res['lost_qubits']
-                    # Remove lost qubits from traveling qubits
-                    remaining_qubits = list(set(remaining_qubits) - set(lost_qubits))
-                    # Add lost_qubits lost from current device to total_lost_qubits
-                    total_lost_qubits += lost_qubits
-                if 'delay' in res.keys(): travel_delay += res['delay']
-            else: break
+        # Split qubits lost at the source (negative or -inf) from those still traveling
+        total_lost_qubits = []
+        remaining_qubits = []
+        for q in traveling_qubits:
+            if q < 0: total_lost_qubits.append(q)
+            else: remaining_qubits.append(q)
+
+        for devices in travel_chain:
+            for device in devices:
+                # If qubits are remaining 
+                if remaining_qubits: 
+                    res = device.apply(program, traveling_qubits)
+                    lost_qubits = res.get('lost_qubits')
+                    if lost_qubits is not None:
+                        # Remove lost qubits from traveling qubits
+                        lost = set(lost_qubits)
+                        remaining_qubits = [q for q in remaining_qubits if q not in lost]
+                        # Add lost_qubits lost from current device to total_lost_qubits
+                        total_lost_qubits += lost_qubits
+                    travel_delay += res.get('delay', 0)
+                else: break
 
         # Remove traveling_qubits
-        agent.qubits = list(set(agent.qubits) - set(traveling_qubits))   
+        agent.qubits.difference_update(traveling_qubits)
 
         lost_qubits_flipped = []
         for q in total_lost_qubits: 
@@ -152,7 +185,7 @@ class QConnect:
 
         # Add inverted lost qubits to remaining qubits
         traveling_qubits = remaining_qubits + lost_qubits_flipped
-        agent.qubits += traveling_qubits
+        agent.qubits.update(traveling_qubits)
         scaled_delay = travel_delay*num_travel_qubits + source_delay
         return traveling_qubits, scaled_delay, source_time
 
@@ -175,23 +208,26 @@ class CConnect:
 
         for agent in agents:
             self.agents.update({agent.name: agent})
-            self.queues.update({agent.name: queue.Queue()})
+            self.queues.update({agent.name: _PacketQueue()})
 
             for agentConnect in agents:
                 if agentConnect != agent:
                     agent.cconnections[agentConnect.name] = self
 
         self.length = length
+        # Travel time per cbit over the connection
+        self._travel_delay = length/signal_speed
 
     def put(self, target, cbits):
         ''' 
-        Places cbits on queue keyed on the target Agent's name
+        Places cbits on queue keyed on the target Agent's name. Each cbit is sent
+        as a single pulse, so the source delay is one pulse length per cbit.
 
         :param String target: name of recipient of program
         :param Array cbits: array of numbers corresponding to cbits agent is sending
-        :returns: time for cbits to travel
+        :returns: time for cbits to leave the source
         '''
-        csource_delay = pulse_length_default * 8 * sys.getsizeof(cbits)
+        csource_delay = pulse_length_default * len(cbits)
         self.queues[target].put((cbits, csource_delay))
         return csource_delay
 
@@ -203,8 +239,6 @@ class CConnect:
         :returns: cbits from source and time they took to travel
         '''
         cbits, source_delay = self.queues[agent].get()
-        travel_delay = self.length/signal_speed
-        
-        scaled_delay = travel_delay*len(cbits) + source_delay
+        scaled_delay = self._travel_delay*len(cbits) + source_delay
 
         return cbits, scaled_delay
\ No newline at end of file
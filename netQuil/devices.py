@@ -1,8 +1,5 @@
 import numpy as np
-import uuid
 
-from pyquil import Program
-from pyquil.gates import *
 from netQuil import noise
 
 __all__ = ["Fiber", "Laser", "Device"]
@@ -100,17 +97,18 @@ class Laser(Device):
         :param List<int> qubits: list of qubits going through laser
         :return: time it took qubits to pass through device
         '''
-        for qubit in qubits:
-            if qubit < 0: continue
-
-            if self.apply_error:
-                numPhotons = np.random.poisson(lam=self.photon_expectation)
-                self.trials += len(qubits)
-                if numPhotons == self.photon_expectation: self.success += 1
-                '''
-                Rotation Noise
-                noise.normal_unitary_rotation(program, qubit, 0.5, self.variance)
-                '''
+        if self.apply_error:
+            # Qubits that have not been lost, each emitted as its own photon pulse
+            num_pulses = sum(1 for qubit in qubits if qubit >= 0)
+            # Draw the photon count of every pulse at once
+            numPhotons = np.random.poisson(lam=self.photon_expectation, size=num_pulses)
+            self.trials += num_pulses
+            self.success += int(np.count_nonzero(numPhotons == self.photon_expectation))
+            '''
+            Rotation Noise
+            for qubit in qubits:
+                if qubit >= 0: noise.normal_unitary_rotation(program, qubit, 0.5, self.variance)
+            '''
         delay = self.pulse_length
         return {
             'delay': delay
@@ -1,7 +1,6 @@
-from pyquil import Program
-from pyquil.api import WavefunctionSimulator, QVMConnection
-from pyquil.gates import *
-from netQuil import *
+import numpy as np
+
+from pyquil.gates import H, CNOT, CPHASE, MEASURE, X, Z, XOR
 
 __all__ = ["cat_entangler", "cat_disentangler", "QFT"]
 
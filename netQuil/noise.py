@@ -1,32 +1,45 @@
+import functools
+import itertools
+import threading
+import weakref
 import numpy as np
-import uuid
 
-from pyquil.gates import *
+from pyquil.gates import RX, RZ, MEASURE
 from pyquil.quil import DefGate
+from pyquil.quilbase import Declare
 from pyquil.noise import pauli_kraus_map
 
-__all__ = ["bit_flip", "phase_flip", "depolarizing_noise", "measure","normal_unitary_rotation"]
+__all__ = ["bit_flip", "phase_flip", "depolarizing_noise", "init_measurement", "measure","normal_unitary_rotation"]
 
-ro = None
+# Size of classical registers declared for measurements when init_measurement is not called
+measure_capacity_default = 64
 
+# Pauli matrices as complex128, stacked contiguously for building kraus operators
+_I = np.array([[1, 0], [0, 1]], dtype=np.complex128)
+_X = np.array([[0, 1], [1, 0]], dtype=np.complex128)
+_Y = np.array([[0, 0-1.0j], [0+1.0j, 0]], dtype=np.complex128)
+_Z = np.array([[1, 0], [0, -1]], dtype=np.complex128)
+_PAULIS = np.stack([_I, _X, _Y, _Z])
+
+@functools.lru_cache(maxsize=256)
 def kraus_op_bit_flip(prob: float):
-    noisy_I = np.sqrt(1-prob) * np.asarray([[1, 0], [0, 1]])
-    noisy_X = np.sqrt(prob) * np.asarray([[0, 1], [1, 0]])
+    noisy_I = np.sqrt(1-prob) * _I
+    noisy_X = np.sqrt(prob) * _X
     return [noisy_I, noisy_X]
 
 
+@functools.lru_cache(maxsize=256)
 def kraus_op_phase_flip(prob: float):
-    noisy_I = np.sqrt(1-prob) * np.asarray([[1, 0], [0, 1]])
-    noisy_Z = np.sqrt(prob) * np.asarray([[1, 0], [0, -1]])
+    noisy_I = np.sqrt(1-prob) * _I
+    noisy_Z = np.sqrt(prob) * _Z
     return [noisy_I, noisy_Z]
 
 
+@functools.lru_cache(maxsize=256)
 def kraus_op_depolarizing_channel(prob: float):
-    noisy_I = np.sqrt(1-prob) * np.asarray([[1, 0], [0, 1]])
-    noisy_X = np.sqrt(prob/3) * np.asarray([[0, 1], [1, 0]])
-    noisy_Z = np.sqrt(prob/3) * np.asarray([[1, 0], [0, -1]])
-    noisy_Y = np.sqrt(prob/3) * np.asarray([[0, 0-1.0j], [0+1.0j, 0]])
-    return [noisy_I, noisy_X, noisy_Y, noisy_Z]
+    # Scale I, X, Y, Z in one broadcast over the stacked paulis
+    coefficients = np.sqrt([1-prob, prob/3, prob/3, prob/3])
+    return list(coefficients[:, None, None] * _PAULIS)
 
 def random_unitary(n):
     # draw complex matrix from Ginibre ensemble
@@ -38,7 +51,95 @@ def random_unitary(n):
     l = np.diag(d) / np.abs(d)
     return np.matmul(q, l)
 
+def random_unitary_batch(k, n):
+    '''
+    Generate k random unitaries with a single batched QR decomposition
+
+    :param Integer k: number of unitaries
+    :param Integer n: dimension of each unitary
+    :return: array of shape (k, n, n)
+    '''
+    # draw k complex matrices from Ginibre ensemble
+    z = np.random.randn(k, n, n) + 1j * np.random.randn(k, n, n)
+    # QR decompose all matrices at once
+    q, r = np.linalg.qr(z)
+    # make each decomposition unique by rescaling columns of q
+    d = np.diagonal(r, axis1=-2, axis2=-1)
+    phases = d / np.abs(d)
+    return q * phases[:, None, :]
+
+# Pool of random unitaries used to define noisy gates, cycled rather than regenerated per gate
+_UNITARY_POOL = list(random_unitary_batch(1024, 2))
+_unitary_iter = itertools.cycle(_UNITARY_POOL)
+_unitary_lock = threading.Lock()
+
+def _next_unitary():
+    '''
+    Thread-safe access to the next unitary in the pool
+
+    :return: random 2x2 unitary
+    '''
+    with _unitary_lock:
+        return next(_unitary_iter)
+
+# Noisy gate definitions are reused per program rather than redefined on every call
+_noise_gate_cache = {}
+_noise_gate_lock = threading.Lock()
+_gate_counter = itertools.count()
+
+def _program_cache(cache, program):
+    '''
+    Per-program state stored in cache. Programs are tracked by id with a weak reference, 
+    so entries are dropped once a program is freed.
+
+    :param Dict cache: module-level cache to look program up in
+    :param Program program: program state belongs to
+    :return: dictionary of state for program
+    '''
+    key = id(program)
+    entry = cache.get(key)
+    if entry is None or entry[0]() is not program:
+        def _forget(ref, key=key):
+            if cache.get(key, (None,))[0] is ref:
+                del cache[key]
+        entry = (weakref.ref(program, _forget), {})
+        cache[key] = entry
+    return entry[1]
+
+@functools.lru_cache(maxsize=1024)
+def _noise_applier(kind, kraus_ops, prob):
+    '''
+    Build a function appending the noisy gate of the given kind and probability to a
+    program, with its kraus operators evaluated once. Gates are defined only the first 
+    time a qubit sees this noise on a program; later calls just append the gate.
+
+    :param String kind: prefix of gate name, e.g. "flipNOISE"
+    :param Function kraus_ops: function returning kraus operators for prob
+    :param Float prob: probability of apply noise, rounded by caller
+    :return: function taking program and qubit
+    '''
+    noisy_ops = kraus_ops(prob)
+
+    def apply(program, qubit):
+        key = (kind, prob, qubit)
 
+        # Lock-free lookup for gates already defined on program
+        entry = _noise_gate_cache.get(id(program))
+        gate_name = entry[1].get(key) if entry is not None and entry[0]() is program else None
+
+        if gate_name is None:
+            with _noise_gate_lock:
+                gates = _program_cache(_noise_gate_cache, program)
+                gate_name = gates.get(key)
+                if gate_name is None:
+                    gate_name = kind + str(next(_gate_counter))
+                    gates[key] = gate_name
+                    program += DefGate(gate_name, _next_unitary())
+                    program.define_noisy_gate(gate_name, [qubit], noisy_ops)
+
+        program += (gate_name, qubit)
+
+    return apply
 
 def bit_flip(program, qubit, prob: float):
     '''
@@ -48,13 +149,7 @@ def bit_flip(program, qubit, prob: float):
     :param Integer qubit: qubit to apply noise to 
     :param Float prob: probability of apply noise 
     '''
-    unique_id = uuid.uuid1().int
-
-    flip_noisy_I_definition = DefGate("flipNOISE" + str(unique_id), random_unitary(2))
-    program += flip_noisy_I_definition
-    
-    program.define_noisy_gate("flipNOISE" + str(unique_id), [qubit], kraus_op_bit_flip(prob))
-    program += ("flipNOISE" + str(unique_id), qubit)
+    _noise_applier("flipNOISE", kraus_op_bit_flip, round(prob, 12))(program, qubit)
 
 def phase_flip(program, qubit, prob: float):
     '''
@@ -64,14 +159,7 @@ def phase_flip(program, qubit, prob: float):
     :param Integer qubit: qubit to apply noise to 
     :param Float prob: probability of apply noise 
     '''
-
-    unique_id = uuid.uuid1().int
-
-    phase_noisy_I_definition = DefGate("phaseNOISE" + str(unique_id), random_unitary(2))
-    program += phase_noisy_I_definition
-    
-    program.define_noisy_gate("phaseNOISE" + str(unique_id), [qubit], kraus_op_phase_flip(prob))
-    program += ("phaseNOISE" + str(unique_id), qubit)
+    _noise_applier("phaseNOISE", kraus_op_phase_flip, round(prob, 12))(program, qubit)
 
 def depolarizing_noise(program, qubit, prob: float):
     '''
@@ -81,17 +169,77 @@ def depolarizing_noise(program, qubit, prob: float):
     :param Integer qubit: qubit to apply noise to 
     :param Float prob: probability of apply noise 
     '''
-    unique_id = uuid.uuid1().int
+    _noise_applier("dpNOISE", kraus_op_depolarizing_channel, round(prob, 12))(program, qubit)
+
+class _MeasureState:
+    def __init__(self, program, name, capacity):
+        '''
+        Classical register that measurements of a given name are written to, and the
+        index of its next free bit. Registers already declared on program (e.g. when it
+        was copied from another program) are scanned once so names never collide.
+
+        :param Program program: program to declare register on
+        :param String name: name of quil classical register
+        :param Integer capacity: number of bits in register
+        '''
+        self.name = name
+        self.capacity = capacity
+        self.num_registers = 0
+        self.declared = {inst.name for inst in program.instructions if isinstance(inst, Declare)}
+        self._declare_register(program)
+
+    def _declare_register(self, program):
+        '''
+        Declare a new register, named name followed by a counter if name is taken
+
+        :param Program program: program to declare register on
+        '''
+        register = self.name
+        while register in self.declared:
+            self.num_registers += 1
+            register = self.name + str(self.num_registers)
 
-    dp_noisy_I_definition = DefGate("dpNOISE" + str(unique_id), random_unitary(2))
-    program += dp_noisy_I_definition
-    
-    program.define_noisy_gate("dpNOISE" + str(unique_id), [qubit], kraus_op_depolarizing_channel(prob))
-    program += ("dpNOISE" + str(unique_id), qubit)
+        self.declared.add(register)
+        self.ro_ref = program.declare(register, 'BIT', self.capacity)
+        self.next_index = 0
+
+    def next_bit(self, program):
+        '''
+        Reserve the next free bit, declaring another register of the same capacity 
+        once the current one is full
+
+        :param Program program: program register is declared on
+        :return: reference to reserved bit
+        '''
+        if self.next_index == self.capacity:
+            self._declare_register(program)
+
+        bit = self.ro_ref[self.next_index]
+        self.next_index += 1
+        return bit
+
+# Measurement registers declared per program, keyed on register name
+_measure_states = {}
+_measure_lock = threading.Lock()
+
+def init_measurement(program, capacity, name):
+    '''
+    Declare the classical register measurements of the given name are written to. Call
+    once per program before measuring; otherwise a register of measure_capacity_default
+    bits is declared on the first measurement
+
+    :param Program program: program to declare register on
+    :param Integer capacity: expected number of measurements
+    :param String name: name of quil classical register
+    '''
+    with _measure_lock:
+        states = _program_cache(_measure_states, program)
+        states[name] = _MeasureState(program, name, capacity)
 
 def measure(program, qubit, prob: float, name):
     '''
-    Measure the qubit with probability
+    Measure the qubit with probability. Each measurement is written to its own bit of
+    the classical register name
 
     :param Program program: program to apply noise to
     :param Integer qubit: qubit to apply noise to 
@@ -100,24 +248,15 @@ def measure(program, qubit, prob: float, name):
     :returns: None if qubit is not measured and qubit if qubit is measured
     '''
     if np.random.rand()> prob:
-        global ro
-
-        devices_ro_exists = False
-        ro_exists = False
-        for inst in program.instructions: 
-            try: 
-                if inst.name == name:
-                    devices_ro_exists = True
-                elif inst.name == "ro":
-                    ro_exists = True
-            except: pass
-
-        if not ro_exists:
-            ro = program.declare("ro", 'BIT', 1)
-        elif ro_exists and not devices_ro_exists:
-            ro = program.declare(name, 'BIT', 1)
-
-        program += MEASURE(qubit, ro)
+        with _measure_lock:
+            states = _program_cache(_measure_states, program)
+            state = states.get(name)
+            if state is None:
+                state = _MeasureState(program, name, measure_capacity_default)
+                states[name] = state
+            bit = state.next_bit(program)
+
+        program += MEASURE(qubit, bit)
         return qubit
     return None
 
@@ -31,6 +31,8 @@ class Simulation:
             attrs_tuples = [a for a in attributes if not(a[0].startswith('__') and a[0].endswith('__'))]
             attrs_dict = dict(attrs_tuples)
             attrs_clean = {k: v for k, v in attrs_dict.items() if k not in THREADING_ATTRS}
+            # Qubits are updated in place, so store a snapshot rather than the live set
+            attrs_clean["qubits"] = set(agent.qubits)
             attrs_clean["program"] = program
             self.agent_copies.append(attrs_clean)
 
@@ -47,6 +49,10 @@ class Simulation:
             new_agent = agent_classes[indx]()
             for k in copy:
                 try: 
+                    # Give each trial a fresh set of qubits so the snapshot is never mutated
+                    if k == 'qubits':
+                        setattr(new_agent, k, set(copy[k]))
+                        continue
                     setattr(new_agent, k, copy[k])
                     if k == 'program' and program_copy == None:
                         program_copy = copy[k].copy()
@@ -80,7 +86,7 @@ class Simulation:
             if agent.program == None: 
                 agent.program = p
 
-    def run(self, trials=1, agent_classes=[], network_monitor=False):
+    def run(self, trials=1, agent_classes=None, network_monitor=False):
         '''
         Run the simulation
 
@@ -89,6 +95,8 @@ class Simulation:
         :param Boolean network_monitor: outputs each network transaction and device information
         :return: returns list of programs. One for each trial
         '''
+        agent_classes = [] if agent_classes is None else agent_classes
+
         # If program is not set, add default
         self._add_program()
         
@@ -20,7 +20,7 @@ setuptools.setup(
         "Operating System :: OS Independent",
     ),
     install_requires=[
-        "numpy",
+        "numpy>=1.22",
         "pyquil"
     ],
 )